@@ -1,20 +1,45 @@
 """Flask API entrypoint for the multilingual chatbot."""
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
-import uuid
-from typing import Dict, List
-
-from flask import Flask, Response as FlaskResponse, jsonify, make_response, request, send_from_directory
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple, TypeVar
+from uuid import uuid4
+
+import orjson
+from flask import (
+    Flask,
+    Response as FlaskResponse,
+    make_response,
+    request,
+    stream_with_context,
+)
 from flask_cors import CORS
 
+from ml.cache import LRUCache, ResponseCache, load_sentence_embedder
+from ml.native_threads import native_lock
 from ml.orchestrator import PromptOrchestrator
 
+try:
+    from gevent import get_hub
+    from gevent.monkey import is_module_patched
+except ImportError:  # pragma: no cover - gevent is only required by wsgi.py
+    get_hub = None  # type: ignore
+    is_module_patched = None  # type: ignore
+
 LOGGER = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
+T = TypeVar("T")
+
 app = Flask(__name__)
 app.config["JSON_SORT_KEYS"] = False
 CORS(
@@ -26,11 +51,28 @@ CORS(
 )
 
 
+class _SessionColumns:
+    """Column-oriented chat records for a single session."""
+
+    __slots__ = ("user_inputs", "bot_responses", "source_languages", "target_languages", "timestamps")
+
+    def __init__(self) -> None:
+        self.user_inputs: List[str] = []
+        self.bot_responses: List[str] = []
+        self.source_languages: List[str] = []
+        self.target_languages: List[str] = []
+        self.timestamps = array("d")
+
+
 class ChatHistoryRepository:
-    """In-memory storage for chat history records keyed by session."""
+    """In-memory storage for chat history records keyed by session.
+
+    Records are stored as parallel columns per session and only materialised as
+    dictionaries when read, which avoids a dict allocation per stored turn.
+    """
 
     def __init__(self) -> None:
-        self._store: Dict[str, List[Dict[str, str]]] = {}
+        self._store: Dict[str, _SessionColumns] = {}
 
     def append(
         self,
@@ -40,41 +82,114 @@ class ChatHistoryRepository:
         source_language: str,
         target_language: str,
     ) -> None:
-        record = {
-            "session_id": session_id,
-            "user_input": user_input,
-            "bot_response": bot_response,
-            "source_language": source_language,
-            "target_language": target_language,
-        }
-        self._store.setdefault(session_id, []).append(record)
+        columns = self._store.get(session_id)
+        if columns is None:
+            columns = self._store[session_id] = _SessionColumns()
+        columns.user_inputs.append(user_input)
+        columns.bot_responses.append(bot_response)
+        columns.source_languages.append(sys.intern(source_language))
+        columns.target_languages.append(sys.intern(target_language))
+        columns.timestamps.append(time.time())
 
     def get(self, session_id: str) -> List[Dict[str, str]]:
-        return list(self._store.get(session_id, []))
+        columns = self._store.get(session_id)
+        if columns is None:
+            return []
+        return [
+            {
+                "session_id": session_id,
+                "timestamp": datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(),
+                "user_input": user_input,
+                "bot_response": bot_response,
+                "source_language": source_language,
+                "target_language": target_language,
+            }
+            for user_input, bot_response, source_language, target_language, timestamp in zip(
+                columns.user_inputs,
+                columns.bot_responses,
+                columns.source_languages,
+                columns.target_languages,
+                columns.timestamps,
+            )
+        ]
 
     def clear(self, session_id: str) -> None:
         self._store.pop(session_id, None)
 
 
 class OrchestratorPool:
-    """Maintain a LangChain orchestrator per session to preserve memory."""
+    """Maintain a LangChain orchestrator per session to preserve memory.
 
-    def __init__(self, model_path: str | None, generation_config: Dict[str, object] | None) -> None:
+    At most ``max_sessions`` orchestrators are kept alive; the least recently used
+    session is reset and dropped when a new one arrives, and sessions idle for
+    longer than ``session_ttl_seconds`` are reaped on the next access. Extra keyword
+    arguments are forwarded to every :class:`PromptOrchestrator`.
+
+    The first orchestrator loads the model, so routes call the pool through
+    :func:`_run_blocking`; the lock is native because it is taken on threadpool workers.
+    """
+
+    def __init__(
+        self,
+        model_path: str | None,
+        generation_config: Dict[str, object] | None,
+        response_cache: ResponseCache | None = None,
+        prompt_cache_size: int = 4096,
+        max_sessions: int = 256,
+        session_ttl_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        **orchestrator_options: object,
+    ) -> None:
         self._model_path = model_path
         self._generation_config = generation_config
-        self._instances: Dict[str, PromptOrchestrator] = {}
+        self._response_cache = response_cache
+        self._prompt_cache = LRUCache(prompt_cache_size) if prompt_cache_size > 0 else None
+        self._max_sessions = max(1, max_sessions)
+        self._session_ttl_seconds = session_ttl_seconds
+        self._clock = clock
+        self._orchestrator_options = orchestrator_options
+        self._instances: "OrderedDict[str, Tuple[PromptOrchestrator, float]]" = OrderedDict()
+        self._lock = native_lock()
+
+    def __len__(self) -> int:
+        return len(self._instances)
 
     def get(self, session_id: str) -> PromptOrchestrator:
-        if session_id not in self._instances:
-            self._instances[session_id] = PromptOrchestrator(
-                model_path=self._model_path, generation_config=self._generation_config
-            )
-        return self._instances[session_id]
+        now = self._clock()
+        with self._lock:
+            self._reap_idle(now)
+            entry = self._instances.pop(session_id, None)
+            if entry is None:
+                while len(self._instances) >= self._max_sessions:
+                    _, (evicted, _) = self._instances.popitem(last=False)
+                    evicted.reset()
+                orchestrator = PromptOrchestrator(
+                    model_path=self._model_path,
+                    generation_config=self._generation_config,
+                    response_cache=self._response_cache,
+                    prompt_cache=self._prompt_cache,
+                    **self._orchestrator_options,
+                )
+            else:
+                orchestrator = entry[0]
+            self._instances[session_id] = (orchestrator, now)
+            return orchestrator
 
     def reset(self, session_id: str) -> None:
-        if session_id in self._instances:
-            self._instances[session_id].reset()
+        with self._lock:
+            entry = self._instances.pop(session_id, None)
+        if entry is not None:
+            entry[0].reset()
+
+    def _reap_idle(self, now: float) -> None:
+        if not self._session_ttl_seconds:
+            return
+        while self._instances:
+            session_id, (orchestrator, last_access) = next(iter(self._instances.items()))
+            if now - last_access < self._session_ttl_seconds:
+                break
             del self._instances[session_id]
+            orchestrator.reset()
 
 
 def _load_generation_config() -> Dict[str, object] | None:
@@ -91,33 +206,142 @@ def _load_generation_config() -> Dict[str, object] | None:
         return None
 
 
+def _env_number(name: str, default: float, cast: Callable[[str], float] = int) -> float:
+    raw_value = os.environ.get(name)
+    if not raw_value:
+        return default
+    try:
+        return cast(raw_value)
+    except ValueError:
+        LOGGER.warning("Ignoring invalid %s=%r", name, raw_value)
+        return default
+
+
+def _load_response_cache() -> ResponseCache | None:
+    """Build the cross-session response cache when ORCHESTRATOR_RESPONSE_CACHE_SIZE is set."""
+    max_entries = _env_number("ORCHESTRATOR_RESPONSE_CACHE_SIZE", 0)
+    if max_entries <= 0:
+        return None
+    ttl_seconds = _env_number("ORCHESTRATOR_RESPONSE_CACHE_TTL_SECONDS", 0.0, float) or None
+    embedder = None
+    if os.environ.get("ORCHESTRATOR_SEMANTIC_CACHE", "").lower() in {"1", "true", "yes"}:
+        embedder = load_sentence_embedder()
+    return ResponseCache(max_entries=max_entries, ttl_seconds=ttl_seconds, embedder=embedder)
+
+
 MODEL_PATH = os.environ.get("FINE_TUNED_MODEL_PATH")
 GENERATION_CONFIG = _load_generation_config()
+RESPONSE_CACHE = _load_response_cache()
+PROMPT_CACHE_SIZE = _env_number("ORCHESTRATOR_PROMPT_CACHE_SIZE", 4096)
+# Unset lets the orchestrator size history to the loaded model's context window.
+HISTORY_TOKEN_LIMIT = _env_number("ORCHESTRATOR_HISTORY_TOKEN_LIMIT", 0) or None
+MAX_SESSIONS = _env_number("ORCHESTRATOR_MAX_SESSIONS", 256)
+SESSION_TTL_SECONDS = _env_number("ORCHESTRATOR_SESSION_TTL_SECONDS", 0.0, float) or None
+QUANTIZATION = os.environ.get("ORCHESTRATOR_QUANTIZATION") or None
+MAX_BATCH_SIZE = _env_number("ORCHESTRATOR_MAX_BATCH_SIZE", 1)
+BATCH_WAIT_MS = _env_number("ORCHESTRATOR_BATCH_WAIT_MS", 10.0, float)
+TORCH_COMPILE = os.environ.get("ORCHESTRATOR_TORCH_COMPILE", "").lower() in {"1", "true", "yes"}
+MAX_REQUEST_BYTES = _env_number("MAX_REQUEST_BYTES", 64 * 1024)
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
+
+_INDEX_BYTES = (Path(__file__).resolve().parent / "templates" / "index.html").read_bytes()
+_INDEX_ETAG = hashlib.blake2b(_INDEX_BYTES, digest_size=8).hexdigest()
 
 _history_repo = ChatHistoryRepository()
-_orchestrators = OrchestratorPool(MODEL_PATH, GENERATION_CONFIG)
+_orchestrators = OrchestratorPool(
+    MODEL_PATH,
+    GENERATION_CONFIG,
+    RESPONSE_CACHE,
+    PROMPT_CACHE_SIZE,
+    MAX_SESSIONS,
+    SESSION_TTL_SECONDS,
+    history_token_limit=HISTORY_TOKEN_LIMIT,
+    quantization=QUANTIZATION,
+    max_batch_size=MAX_BATCH_SIZE,
+    batch_wait_ms=BATCH_WAIT_MS,
+    torch_compile=TORCH_COMPILE,
+)
+
+
+def _run_blocking(func: Callable[..., T], *args: object, **kwargs: object) -> T:
+    """Run CPU-bound model work off the gevent loop when served through wsgi.py."""
+    if is_module_patched is not None and is_module_patched("socket"):
+        return get_hub().threadpool.apply(func, args, kwargs)
+    return func(*args, **kwargs)
+
+
+def _iter_blocking(iterator: Iterator[T]) -> Iterator[T]:
+    """Advance ``iterator`` through :func:`_run_blocking` so each step runs off the gevent loop."""
+    done = object()
+    while True:
+        item = _run_blocking(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+def _json_response(obj: object, status: int = 200) -> FlaskResponse:
+    return FlaskResponse(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _json_body() -> Dict[str, object]:
+    """Parse the request body with orjson, treating malformed or non-object JSON as empty."""
+    try:
+        body = orjson.loads(request.get_data(cache=False) or b"{}")
+    except orjson.JSONDecodeError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+@app.before_request
+def _reject_unbounded_body() -> FlaskResponse | None:
+    """Refuse chunked bodies and anything over ``MAX_REQUEST_BYTES`` before it is read."""
+    if "Transfer-Encoding" in request.headers:
+        return _json_response({"error": "Transfer-Encoding is not supported"}, status=400)
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BYTES:
+        return _json_response({"error": "Request body too large"}, status=413)
+    return None
+
+
+def _as_str(value: object) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+def _parse_chat_request() -> Tuple[str, str, str, str]:
+    """Return ``(message, source_language, target_language, session_id)`` from the JSON body."""
+    body = _json_body()
+    user_input = _as_str(body.get("message", ""))
+    target_language = _as_str(body.get("target_language", "en"))
+    source_language = _as_str(body.get("source_language", "auto"))
+    if source_language.lower() == "auto":
+        source_language = "en"
+    session_id = _as_str(body.get("session_id") or uuid4().hex)
+    return user_input, source_language, target_language, session_id
+
+
+def _sse_event(data: Dict[str, object], event: str | None = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
 
 
 @app.route("/", methods=["GET"])
 def index() -> FlaskResponse:
-    """Serve the landing page for ad-hoc manual testing."""
-    return send_from_directory("templates", "index.html")
+    """Serve the landing page for ad-hoc manual testing from memory."""
+    response = FlaskResponse(_INDEX_BYTES, mimetype="text/html")
+    response.set_etag(_INDEX_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response.make_conditional(request)
 
 
 @app.route("/chat", methods=["POST"])
 def chat() -> FlaskResponse:
     """Run the prompt orchestrator and persist the interaction."""
     try:
-        body = request.get_json(silent=True) or {}
-        user_input = str(body.get("message", ""))
-        target_language = str(body.get("target_language", "en"))
-        source_language = str(body.get("source_language", "auto"))
-        if source_language.lower() == "auto":
-            source_language = "en"
-        session_id = str(body.get("session_id") or uuid.uuid4())
+        user_input, source_language, target_language, session_id = _parse_chat_request()
 
-        orchestrator = _orchestrators.get(session_id)
-        bot_response = orchestrator.run(user_input=user_input, target_language=target_language)
+        orchestrator = _run_blocking(_orchestrators.get, session_id)
+        bot_response = _run_blocking(orchestrator.run, user_input=user_input, target_language=target_language)
 
         _history_repo.append(
             session_id=session_id,
@@ -133,17 +357,58 @@ def chat() -> FlaskResponse:
             "source_language": source_language,
             "target_language": target_language,
         }
-        return jsonify(payload), 200
+        return _json_response(payload)
     except Exception as exc:  # pragma: no cover - defensive branch
         LOGGER.exception("Error processing /chat request")
-        return jsonify({"error": str(exc)}), 500
+        return _json_response({"error": str(exc)}, status=500)
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream() -> FlaskResponse:
+    """Stream the bot response as server-sent events, persisting it once complete."""
+    user_input, source_language, target_language, session_id = _parse_chat_request()
+    orchestrator = _run_blocking(_orchestrators.get, session_id)
+
+    def generate() -> Iterator[str]:
+        chunks: List[str] = []
+        try:
+            tokens = orchestrator.stream(user_input=user_input, target_language=target_language)
+            for token in _iter_blocking(tokens):
+                chunks.append(token)
+                yield _sse_event({"token": token})
+        except Exception as exc:  # pragma: no cover - defensive branch
+            LOGGER.exception("Error processing /chat/stream request")
+            yield _sse_event({"error": str(exc)}, event="error")
+            return
+
+        bot_response = "".join(chunks).strip()
+        _history_repo.append(
+            session_id=session_id,
+            user_input=user_input,
+            bot_response=bot_response,
+            source_language=source_language,
+            target_language=target_language,
+        )
+        payload = {
+            "response": bot_response,
+            "session_id": session_id,
+            "source_language": source_language,
+            "target_language": target_language,
+        }
+        yield _sse_event(payload, event="done")
+
+    return FlaskResponse(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.route("/text-to-speech", methods=["POST"])
 def text_to_speech() -> FlaskResponse:
     """Return deterministic bytes that simulate a text-to-speech payload."""
-    body = request.get_json(silent=True) or {}
-    text = str(body.get("text", ""))
+    body = _json_body()
+    text = _as_str(body.get("text", ""))
     fake_audio = b"ID3" + text.encode("utf-8")
     response = make_response(fake_audio)
     response.headers["Content-Type"] = "audio/mpeg"
@@ -153,15 +418,15 @@ def text_to_speech() -> FlaskResponse:
 @app.route("/chat-history/<session_id>", methods=["GET"])
 def get_chat_history(session_id: str) -> FlaskResponse:
     history = _history_repo.get(session_id)
-    return jsonify(history), 200
+    return _json_response(history)
 
 
 @app.route("/chat-history/<session_id>", methods=["DELETE"])
 def reset_history(session_id: str) -> FlaskResponse:
-    _orchestrators.reset(session_id)
+    _run_blocking(_orchestrators.reset, session_id)
     _history_repo.clear(session_id)
-    return jsonify({"session_id": session_id, "cleared": True}), 200
+    return _json_response({"session_id": session_id, "cleared": True})
 
 
 if __name__ == "__main__":  # pragma: no cover - convenience for local debugging
-    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8000")), debug=True)
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "8000")))
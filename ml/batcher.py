@@ -0,0 +1,102 @@
+"""Dynamic batching of concurrent text-generation requests."""
+from __future__ import annotations
+
+import logging
+import queue
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+from ml.native_threads import native_queue, start_native_thread
+
+LOGGER = logging.getLogger(__name__)
+
+try:
+    import torch
+
+    _TORCH_AVAILABLE = True
+except ImportError:  # pragma: no cover - torch not installed during tests
+    torch = None  # type: ignore
+    _TORCH_AVAILABLE = False
+
+
+class BatchedGenerator:
+    """Coalesce prompts submitted from many threads into padded ``model.generate`` calls.
+
+    A single worker thread takes the first queued prompt, waits up to
+    ``max_wait_ms`` for up to ``max_batch_size - 1`` more, generates them as one
+    left-padded batch and resolves each caller's future with its own continuation.
+    """
+
+    def __init__(
+        self,
+        model,
+        tokenizer,
+        generation_kwargs: Optional[Dict[str, object]] = None,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 10.0,
+        max_input_tokens: int = 1024,
+    ) -> None:
+        if model is not None and not _TORCH_AVAILABLE:
+            raise RuntimeError("BatchedGenerator needs torch to run a model: pip install torch")
+        self._model = model
+        self._tokenizer = tokenizer
+        if tokenizer is not None:
+            # Causal LMs continue from the right edge, so padding must go on the left.
+            tokenizer.padding_side = "left"
+        self._generation_kwargs = dict(generation_kwargs or {})
+        self._max_batch_size = max(1, max_batch_size)
+        self._max_wait_seconds = max_wait_ms / 1000
+        self._max_input_tokens = max_input_tokens
+        # Native so the worker is a real OS thread, not a greenlet, when served through wsgi.py.
+        self._queue: "queue.SimpleQueue[Tuple[str, Future]]" = native_queue()
+        start_native_thread(self._run)
+
+    def generate_async(self, prompt: str) -> Future:
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        return self.generate_async(prompt).result(timeout)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._max_wait_seconds
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._process(batch)
+
+    def _process(self, batch: List[Tuple[str, Future]]) -> None:
+        try:
+            completions = self._generate_batch([prompt for prompt, _ in batch])
+        except Exception as exc:  # pragma: no cover - requires HF runtime
+            LOGGER.exception("Batched generation failed for %d prompts", len(batch))
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), completion in zip(batch, completions):
+            future.set_result(completion)
+
+    def _generate_batch(self, prompts: List[str]) -> List[str]:
+        encoded = self._tokenizer(prompts, padding=True, return_tensors="pt")
+        # Rows are left-padded, so slicing from the right keeps the tail of every prompt,
+        # matching the single-request path; one over-long prompt can't fail the whole batch.
+        input_ids = encoded["input_ids"][:, -self._max_input_tokens :].to(self._model.device)
+        attention_mask = encoded["attention_mask"][:, -self._max_input_tokens :].to(self._model.device)
+        with torch.inference_mode():
+            output_ids = self._model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                pad_token_id=self._tokenizer.pad_token_id,
+                **self._generation_kwargs,
+            )
+        new_tokens = output_ids[:, input_ids.shape[1] :]
+        return self._tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
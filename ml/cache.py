@@ -0,0 +1,221 @@
+"""Response caches shared across chat sessions."""
+from __future__ import annotations
+
+import functools
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+try:
+    import numpy as np
+
+    _NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover - numpy ships with the ML extras only
+    np = None  # type: ignore
+    _NUMPY_AVAILABLE = False
+
+
+def prompt_key(prompt: str) -> str:
+    """Return a compact digest identifying a fully rendered prompt."""
+
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class LRUCache:
+    """Thread-safe string LRU with optional expiry of entries."""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: Optional[float] = None,
+        on_evict: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._on_evict = on_evict
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self._clock():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        expires_at = self._clock() + self._ttl_seconds if self._ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                oldest_key = next(iter(self._entries))
+                self._discard(oldest_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        del self._entries[key]
+        if self._on_evict is not None:
+            self._on_evict(key)
+
+
+@functools.lru_cache(maxsize=None)
+def load_sentence_embedder(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[Callable[[str], "np.ndarray"]]:
+    """Return a callable producing unit-length embeddings, loading the model once."""
+
+    try:  # imported here so the app only pays for it when the semantic cache is enabled
+        from sentence_transformers import SentenceTransformer
+    except Exception:  # pragma: no cover - sentence-transformers is an optional extra
+        SentenceTransformer = None  # type: ignore
+    if not _NUMPY_AVAILABLE or SentenceTransformer is None:
+        LOGGER.warning(
+            "sentence-transformers is unavailable (pip install sentence-transformers); "
+            "semantic cache lookups are disabled."
+        )
+        return None
+    try:
+        model = SentenceTransformer(model_name)
+    except Exception as exc:  # pragma: no cover - requires model download
+        LOGGER.warning("Failed to load embedding model %s: %s", model_name, exc)
+        return None
+
+    def embed(text: str) -> "np.ndarray":
+        return model.encode(text, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+    return embed
+
+
+class CacheLookup(NamedTuple):
+    """Result of :meth:`ResponseCache.lookup`; pass ``embedding`` back to ``put`` on a miss."""
+
+    response: Optional[str]
+    embedding: Optional["np.ndarray"] = None
+
+
+class ResponseCache:
+    """Cache bot responses by target language and normalised user input.
+
+    Exact repeats are served from an LRU keyed on a SHA-256 digest. When an
+    ``embedder`` is supplied, misses fall back to a cosine-similarity search over
+    the embeddings of the cached prompts for the same target language.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        ttl_seconds: Optional[float] = None,
+        embedder: Optional[Callable[[str], "np.ndarray"]] = None,
+        similarity_threshold: float = 0.95,
+    ) -> None:
+        self._max_entries = max_entries
+        self._entries = LRUCache(max_entries, ttl_seconds, on_evict=self._release_row)
+        self._embedder = embedder if _NUMPY_AVAILABLE else None
+        self._similarity_threshold = similarity_threshold
+        self._index_lock = threading.Lock()
+        self._matrix: Optional["np.ndarray"] = None
+        self._rows: Dict[str, int] = {}
+        self._row_keys: List[Optional[str]] = []
+        self._row_languages: Optional["np.ndarray"] = None  # language id per row, -1 when free
+        self._language_ids: Dict[str, int] = {}
+        self._free_rows: List[int] = []
+
+    @staticmethod
+    def make_key(target_language: str, user_input: str) -> str:
+        normalised = f"{target_language}\n{user_input.strip().lower()}"
+        return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+    def get(self, target_language: str, user_input: str) -> Optional[str]:
+        return self.lookup(target_language, user_input).response
+
+    def lookup(self, target_language: str, user_input: str) -> CacheLookup:
+        """Return the cached response, plus the query embedding computed on a semantic miss."""
+        response = self._entries.get(self.make_key(target_language, user_input))
+        if response is not None or self._embedder is None:
+            return CacheLookup(response)
+        embedding = self._embed(user_input)
+        similar_key = self._nearest_key(target_language, embedding)
+        response = self._entries.get(similar_key) if similar_key is not None else None
+        return CacheLookup(response, embedding)
+
+    def put(
+        self,
+        target_language: str,
+        user_input: str,
+        response: str,
+        embedding: Optional["np.ndarray"] = None,
+    ) -> None:
+        key = self.make_key(target_language, user_input)
+        if embedding is None and self._embedder is not None:
+            embedding = self._embed(user_input)
+        self._entries.put(key, response)
+        if embedding is not None and self._embedder is not None:
+            self._index(key, target_language, embedding)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _embed(self, user_input: str) -> "np.ndarray":
+        return self._embedder(user_input.strip().lower())  # type: ignore[misc]
+
+    def _nearest_key(self, target_language: str, embedding: "np.ndarray") -> Optional[str]:
+        with self._index_lock:
+            language_id = self._language_ids.get(target_language)
+            if self._matrix is None or not self._row_keys or language_id is None:
+                return None
+            rows = len(self._row_keys)
+            scores = self._matrix[:rows] @ embedding
+            scores[self._row_languages[:rows] != language_id] = -np.inf
+            row = int(np.argmax(scores))
+            if scores[row] < self._similarity_threshold:
+                return None
+            return self._row_keys[row]
+
+    def _index(self, key: str, target_language: str, embedding: "np.ndarray") -> None:
+        with self._index_lock:
+            if key in self._rows:
+                return
+            if self._matrix is None:
+                self._matrix = np.zeros((self._max_entries, embedding.shape[0]), dtype=np.float32)
+                self._row_languages = np.full(self._max_entries, -1, dtype=np.int32)
+            if self._free_rows:
+                row = self._free_rows.pop()
+            elif len(self._row_keys) < self._max_entries:
+                row = len(self._row_keys)
+                self._row_keys.append(None)
+            else:  # pragma: no cover - only reachable when evictions race with inserts
+                return
+            self._matrix[row] = embedding
+            self._rows[key] = row
+            self._row_keys[row] = key
+            self._row_languages[row] = self._language_ids.setdefault(target_language, len(self._language_ids))
+
+    def _release_row(self, key: str) -> None:
+        with self._index_lock:
+            row = self._rows.pop(key, None)
+            if row is None:
+                return
+            self._matrix[row] = 0.0  # type: ignore[index]
+            self._row_keys[row] = None
+            self._row_languages[row] = -1
+            self._free_rows.append(row)
@@ -0,0 +1,40 @@
+"""OS-level threads and queues that stay native when gevent has monkey-patched the stdlib."""
+from __future__ import annotations
+
+import _thread
+import queue
+import threading
+from typing import Callable
+
+try:
+    from gevent.monkey import get_original
+except ImportError:  # pragma: no cover - gevent is only required by wsgi.py
+    get_original = None  # type: ignore
+
+
+def start_native_thread(target: Callable[[], None]) -> None:
+    """Run ``target`` on a real OS thread.
+
+    Under ``monkey.patch_all()`` a ``threading.Thread`` is only a greenlet, so CPU-bound
+    model work started that way would run on, and block, the event loop.
+    """
+
+    start = get_original("_thread", "start_new_thread") if get_original else _thread.start_new_thread
+    start(target, ())
+
+
+def native_queue() -> "queue.SimpleQueue":
+    """Return a queue that can pass items between OS threads under gevent.
+
+    A blocking ``get`` parks the calling OS thread instead of switching greenlets.
+    """
+
+    simple_queue = get_original("queue", "SimpleQueue") if get_original else queue.SimpleQueue
+    return simple_queue()
+
+
+def native_lock() -> "threading.Lock":
+    """Return a lock that serialises OS threads, such as the gevent hub's threadpool workers."""
+
+    lock_type = get_original("threading", "Lock") if get_original else threading.Lock
+    return lock_type()
@@ -1,8 +1,17 @@
 """Prompt orchestration utilities with optional LangChain integration."""
 from __future__ import annotations
 
+import functools
+import json
 import logging
-from typing import Dict, List, Optional
+import re
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional
+
+from ml.batcher import BatchedGenerator
+from ml.cache import CacheLookup, LRUCache, ResponseCache, prompt_key
+from ml.native_threads import native_lock, native_queue, start_native_thread
+from ml.prefix_cache import PrefixKVCache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -13,10 +22,17 @@ PROMPT_TEMPLATE = (
     "User: {user_input}\n"
     "Assistant:"
 )
+SYSTEM_PREFIX = PROMPT_TEMPLATE.split("\n", 1)[0] + "\n"
+
+# Used without a model; a loaded model's limit is derived from its context window instead.
+DEFAULT_HISTORY_TOKEN_LIMIT = 512
+
+# ``[^\S\n]`` is horizontal whitespace, so an empty value never spills onto the next line.
+_LANGUAGE_LINE_RE = re.compile(r"(?mi)^target language:[^\S\n]*(.*?)[^\S\n]*$")
+_USER_LINE_RE = re.compile(r"(?m)^User:[^\S\n]*(.*?)[^\S\n]*$")
 
 try:  # Attempt to import LangChain components
-    from langchain.chains import LLMChain
-    from langchain.memory import ConversationBufferMemory
+    from langchain.memory import ConversationTokenBufferMemory
     from langchain.prompts import PromptTemplate
 
     try:  # LangChain 0.1.x base class
@@ -24,33 +40,256 @@ try:  # Attempt to import LangChain components
     except ImportError:  # pragma: no cover - fallback for older versions
         from langchain.llms.base import LLM as LangChainLLMBase  # type: ignore
 
-    try:  # LangChain 0.1.x integrations live in langchain_community
-        from langchain_community.llms import HuggingFacePipeline
-    except ImportError:  # pragma: no cover - fallback for older versions
-        try:
-            from langchain.llms import HuggingFacePipeline  # type: ignore
-        except ImportError:  # pragma: no cover
-            HuggingFacePipeline = None  # type: ignore
-
     _LANGCHAIN_AVAILABLE = True
 except ImportError:  # pragma: no cover - LangChain not installed in the runtime
-    LLMChain = None  # type: ignore
-    ConversationBufferMemory = None  # type: ignore
+    ConversationTokenBufferMemory = None  # type: ignore
     PromptTemplate = None  # type: ignore
     LangChainLLMBase = object  # type: ignore
-    HuggingFacePipeline = None  # type: ignore
     _LANGCHAIN_AVAILABLE = False
 
 try:
-    from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+    import torch
+    from transformers import (
+        AutoModelForCausalLM,
+        AutoTokenizer,
+        BitsAndBytesConfig,
+        TextIteratorStreamer,
+    )
 
     _TRANSFORMERS_AVAILABLE = True
-except Exception:  # pragma: no cover - transformers not installed during tests
+    _TRANSFORMERS_IMPORT_ERROR: Optional[BaseException] = None
+except Exception as exc:  # pragma: no cover - transformers not installed during tests
+    _TRANSFORMERS_IMPORT_ERROR = exc
+    torch = None  # type: ignore
     AutoModelForCausalLM = None  # type: ignore
     AutoTokenizer = None  # type: ignore
-    pipeline = None  # type: ignore
+    BitsAndBytesConfig = None  # type: ignore
+    TextIteratorStreamer = None  # type: ignore
     _TRANSFORMERS_AVAILABLE = False
 
+QUANTIZATION_MODES = ("8bit", "4bit")
+MAX_INPUT_TOKENS = 1024
+
+
+def _max_input_tokens(model, generation_kwargs: Dict[str, object]) -> int:
+    """Return how many prompt tokens fit in the model's context next to the generated ones."""
+
+    context = getattr(model.config, "max_position_embeddings", None)
+    if not context:
+        return MAX_INPUT_TOKENS
+    max_new_tokens = int(generation_kwargs.get("max_new_tokens") or 0)
+    return max(1, min(MAX_INPUT_TOKENS, context - max_new_tokens))
+
+
+def _history_token_limit(model, tokenizer, generation_kwargs: Dict[str, object]) -> int:
+    """Give history half of the prompt budget left after the template, the rest to the user turn."""
+
+    template = PROMPT_TEMPLATE.format(history="", user_input="", target_language="")
+    template_tokens = len(tokenizer(template)["input_ids"])
+    return max(0, (_max_input_tokens(model, generation_kwargs) - template_tokens) // 2)
+
+
+def _prepare_generate_kwargs(
+    model,
+    tokenizer,
+    prompt: str,
+    generation_kwargs: Dict[str, object],
+    prefix_cache: Optional[PrefixKVCache] = None,
+) -> Dict[str, object]:
+    """Tokenise ``prompt`` and assemble the keyword arguments for ``model.generate``."""
+
+    inputs = tokenizer(prompt, return_tensors="pt")
+    # Keep the tail of over-long prompts: it holds the user turn the model must answer.
+    max_input_tokens = _max_input_tokens(model, generation_kwargs)
+    input_ids = inputs["input_ids"][:, -max_input_tokens:].to(model.device)
+    attention_mask = inputs["attention_mask"][:, -max_input_tokens:].to(model.device)
+    cache_kwargs = prefix_cache.generate_kwargs(input_ids) if prefix_cache is not None else {}
+    return {
+        "input_ids": input_ids,
+        "attention_mask": attention_mask,
+        **generation_kwargs,
+        **cache_kwargs,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+
+
+def _generate(
+    model,
+    tokenizer,
+    prompt: str,
+    generation_kwargs: Dict[str, object],
+    prefix_cache: Optional[PrefixKVCache] = None,
+) -> str:
+    """Run ``model.generate`` on ``prompt`` and decode only the newly generated tokens."""
+
+    kwargs = _prepare_generate_kwargs(model, tokenizer, prompt, generation_kwargs, prefix_cache)
+    with torch.inference_mode():
+        output_ids = model.generate(**kwargs)
+    return tokenizer.decode(output_ids[0, kwargs["input_ids"].shape[1] :], skip_special_tokens=True)
+
+
+def _stream_generate(
+    model,
+    tokenizer,
+    prompt: str,
+    generation_kwargs: Dict[str, object],
+    prefix_cache: Optional[PrefixKVCache] = None,
+) -> Iterator[str]:
+    """Yield decoded text chunks while ``model.generate`` runs on a background thread."""
+
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    # Both ends must be native: a gevent-patched queue cannot hand chunks between OS threads.
+    streamer.text_queue = native_queue()
+    kwargs = _prepare_generate_kwargs(model, tokenizer, prompt, generation_kwargs, prefix_cache)
+    errors: List[BaseException] = []
+
+    def run_generate() -> None:
+        try:
+            with torch.inference_mode():  # inference mode is thread-local, so enter it on the worker
+                model.generate(**kwargs, streamer=streamer)
+        except BaseException as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+            streamer.end()
+
+    start_native_thread(run_generate)
+    for chunk in streamer:
+        if chunk:
+            yield chunk
+    if errors:
+        raise errors[0]
+
+
+class _SharedModel(NamedTuple):
+    tokenizer: Any
+    model: Any
+    generation_kwargs: Dict[str, object]
+    llm: Any
+    prefix_cache: Optional[PrefixKVCache]
+    history_token_limit: int
+
+
+# Taken on the gevent threadpool when served through wsgi.py, so it must be a native lock.
+_SHARED_MODEL_LOCK = native_lock()
+
+
+def _quantization_kwargs(quantization: Optional[str]) -> Dict[str, object]:
+    """Return ``from_pretrained`` arguments for weight-only bitsandbytes quantization."""
+
+    if not quantization:
+        return {}
+    if quantization not in QUANTIZATION_MODES:
+        LOGGER.warning("Unknown quantization mode %r; loading full-precision weights.", quantization)
+        return {}
+    if quantization == "8bit":
+        config = BitsAndBytesConfig(load_in_8bit=True)
+    else:
+        config = BitsAndBytesConfig(
+            load_in_4bit=True,
+            bnb_4bit_quant_type="nf4",
+            bnb_4bit_compute_dtype=torch.bfloat16,
+        )
+    return {"quantization_config": config, "device_map": "auto"}
+
+
+@functools.lru_cache(maxsize=1)
+def _load_shared_model(
+    model_path: str,
+    config_key: str,
+    quantization: Optional[str] = None,
+    max_batch_size: int = 1,
+    batch_wait_ms: float = 10.0,
+    torch_compile: bool = False,
+) -> _SharedModel:
+    """Load the tokenizer, weights and LangChain wrapper once per process."""
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForCausalLM.from_pretrained(model_path, **_quantization_kwargs(quantization))
+    model.eval()
+    model.config.use_cache = True
+    torch.set_float32_matmul_precision("high")
+    if torch_compile:
+        # Compile forward rather than the module so ``model.generate`` keeps working.
+        model.forward = torch.compile(model.forward, mode="reduce-overhead", fullgraph=False)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    generation_kwargs: Dict[str, object] = {
+        "max_new_tokens": 128,
+        "do_sample": False,
+        "temperature": 0.7,
+    }
+    generation_kwargs.update(json.loads(config_key))
+    prefix_cache = PrefixKVCache.build(model, tokenizer, SYSTEM_PREFIX)
+    if max_batch_size > 1:
+        generator = BatchedGenerator(
+            model,
+            tokenizer,
+            generation_kwargs,
+            max_batch_size,
+            batch_wait_ms,
+            _max_input_tokens(model, generation_kwargs),
+        )
+        llm = BatchedLLM(generator, tokenizer)
+    else:
+        llm = DirectLLM(model, tokenizer, generation_kwargs, prefix_cache)
+    return _SharedModel(
+        tokenizer,
+        model,
+        generation_kwargs,
+        llm,
+        prefix_cache,
+        _history_token_limit(model, tokenizer, generation_kwargs),
+    )
+
+
+def _get_shared_model(
+    model_path: str,
+    generation_config: Optional[Dict[str, object]],
+    quantization: Optional[str] = None,
+    max_batch_size: int = 1,
+    batch_wait_ms: float = 10.0,
+    torch_compile: bool = False,
+) -> _SharedModel:
+    config_key = json.dumps(generation_config or {}, sort_keys=True)
+    with _SHARED_MODEL_LOCK:  # keep concurrent first requests from loading the weights twice
+        return _load_shared_model(
+            model_path, config_key, quantization, max_batch_size, batch_wait_ms, torch_compile
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def _log_model_unavailable(model_path: str, reason: str) -> None:
+    """Report, once per process, that a configured model is being replaced by canned replies."""
+
+    LOGGER.error(
+        "FINE_TUNED_MODEL_PATH=%s is set but the model cannot be used (%s); "
+        "serving template responses instead.",
+        model_path,
+        reason,
+    )
+
+
+def _count_words(text: str) -> int:
+    """Approximate a token count when no tokenizer is loaded."""
+
+    return len(text.split())
+
+
+def _stream_words(response: str) -> Iterator[str]:
+    """Yield ``response`` word by word to mirror model streaming when no model is loaded."""
+
+    for index, word in enumerate(response.split(" ")):
+        yield word if index == 0 else f" {word}"
+
+
+def _lookup_response(
+    response_cache: Optional[ResponseCache], target_language: str, user_input: str
+) -> CacheLookup:
+    """Check the response cache, keeping the query embedding for the ``put`` on a miss."""
+
+    if response_cache is None:
+        return CacheLookup(None)
+    return response_cache.lookup(target_language, user_input)
+
 
 class TemplateResponder:
     """A lightweight template-based responder used as a fallback model."""
@@ -65,18 +304,13 @@ class TemplateResponder:
 
     @staticmethod
     def _extract_language(prompt: str) -> str:
-        for line in reversed(prompt.splitlines()):
-            lowered = line.lower()
-            if lowered.startswith("target language:"):
-                return line.split(":", 1)[1].strip() or "en"
-        return "en"
+        matches = _LANGUAGE_LINE_RE.findall(prompt)
+        return (matches[-1] if matches else "") or "en"
 
     @staticmethod
     def _extract_user_message(prompt: str) -> str:
-        for line in reversed(prompt.splitlines()):
-            if line.startswith("User:"):
-                return line.split(":", 1)[1].strip()
-        return ""
+        matches = _USER_LINE_RE.findall(prompt)
+        return matches[-1] if matches else ""
 
 
 if _LANGCHAIN_AVAILABLE:
@@ -91,11 +325,68 @@ if _LANGCHAIN_AVAILABLE:
         def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:  # pragma: no cover - thin wrapper
             return self._responder.generate(prompt)
 
+        def get_num_tokens(self, text: str) -> int:  # pragma: no cover - thin wrapper
+            return _count_words(text)
+
         @property
         def _llm_type(self) -> str:  # pragma: no cover - metadata only
             return "template-responder"
 
 
+    class DirectLLM(LangChainLLMBase):
+        """Adapter that calls ``model.generate`` directly instead of a Transformers pipeline."""
+
+        def __init__(
+            self,
+            model,
+            tokenizer,
+            generation_kwargs: Dict[str, object],
+            prefix_cache: Optional[PrefixKVCache] = None,
+        ) -> None:
+            super().__init__()
+            self._model = model
+            self._tokenizer = tokenizer
+            self._generation_kwargs = generation_kwargs
+            self._prefix_cache = prefix_cache
+
+        def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:  # pragma: no cover - requires HF runtime
+            return _generate(self._model, self._tokenizer, prompt, self._generation_kwargs, self._prefix_cache)
+
+        def get_num_tokens(self, text: str) -> int:  # pragma: no cover - thin wrapper
+            return len(self._tokenizer(text, add_special_tokens=False)["input_ids"])
+
+        @property
+        def _llm_type(self) -> str:  # pragma: no cover - metadata only
+            return "direct-generate"
+
+
+    class BatchedLLM(LangChainLLMBase):
+        """Adapter that routes LangChain calls through a shared :class:`BatchedGenerator`."""
+
+        def __init__(self, generator: BatchedGenerator, tokenizer) -> None:
+            super().__init__()
+            self._generator = generator
+            self._tokenizer = tokenizer
+
+        def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:  # pragma: no cover - thin wrapper
+            return self._generator.generate(prompt)
+
+        def get_num_tokens(self, text: str) -> int:  # pragma: no cover - thin wrapper
+            return len(self._tokenizer(text, add_special_tokens=False)["input_ids"])
+
+        @property
+        def _llm_type(self) -> str:  # pragma: no cover - metadata only
+            return "batched-generator"
+
+
+    # Neither object holds per-session state, so every orchestrator shares them.
+    _PROMPT = PromptTemplate(
+        input_variables=["history", "user_input", "target_language"],
+        template=PROMPT_TEMPLATE,
+    )
+    _TEMPLATE_LLM = TemplateLLM(TemplateResponder())
+
+
     class PromptOrchestrator:
         """Coordinate prompts and conversation state using LangChain."""
 
@@ -103,58 +394,127 @@ if _LANGCHAIN_AVAILABLE:
             self,
             model_path: Optional[str] = None,
             generation_config: Optional[Dict[str, object]] = None,
+            response_cache: Optional[ResponseCache] = None,
+            prompt_cache: Optional[LRUCache] = None,
+            history_token_limit: Optional[int] = None,
+            quantization: Optional[str] = None,
+            max_batch_size: int = 1,
+            batch_wait_ms: float = 10.0,
+            torch_compile: bool = False,
         ) -> None:
-            self._responder = TemplateResponder()
-            self._llm = self._initialise_llm(model_path, generation_config)
-            self._memory = ConversationBufferMemory(
+            self._response_cache = response_cache
+            self._prompt_cache = prompt_cache
+            self._model = None
+            self._tokenizer = None
+            self._generation_kwargs: Dict[str, object] = {}
+            self._prefix_cache: Optional[PrefixKVCache] = None
+            self._default_history_token_limit = DEFAULT_HISTORY_TOKEN_LIMIT
+            self._llm = self._initialise_llm(
+                model_path,
+                generation_config,
+                quantization=quantization,
+                max_batch_size=max_batch_size,
+                batch_wait_ms=batch_wait_ms,
+                torch_compile=torch_compile,
+            )
+            self._memory = ConversationTokenBufferMemory(
+                llm=self._llm,
+                max_token_limit=(
+                    history_token_limit
+                    if history_token_limit is not None
+                    else self._default_history_token_limit
+                ),
                 memory_key="history",
                 input_key="user_input",
                 return_messages=False,
             )
-            self._prompt = PromptTemplate(
-                input_variables=["history", "user_input", "target_language"],
-                template=PROMPT_TEMPLATE,
-            )
-            self._chain = LLMChain(llm=self._llm, prompt=self._prompt, memory=self._memory)
 
         def _initialise_llm(
             self,
             model_path: Optional[str],
             generation_config: Optional[Dict[str, object]],
+            **load_options: object,
         ):
-            if (
-                model_path
-                and HuggingFacePipeline is not None
-                and _TRANSFORMERS_AVAILABLE
-                and AutoModelForCausalLM is not None
-                and AutoTokenizer is not None
-                and pipeline is not None
-            ):
+            if model_path and not _TRANSFORMERS_AVAILABLE:
+                _log_model_unavailable(
+                    model_path, f"transformers failed to import: {_TRANSFORMERS_IMPORT_ERROR!r}"
+                )
+            elif model_path:
                 try:
-                    tokenizer = AutoTokenizer.from_pretrained(model_path)
-                    model = AutoModelForCausalLM.from_pretrained(model_path)
-                    if tokenizer.pad_token is None:
-                        tokenizer.pad_token = tokenizer.eos_token
-                    pipeline_config: Dict[str, object] = {
-                        "max_new_tokens": 128,
-                        "do_sample": False,
-                        "temperature": 0.7,
-                    }
-                    if generation_config:
-                        pipeline_config.update(generation_config)
-                    text_generation = pipeline(
-                        "text-generation", model=model, tokenizer=tokenizer, **pipeline_config
-                    )
-                    return HuggingFacePipeline(pipeline=text_generation)
+                    shared = _get_shared_model(model_path, generation_config, **load_options)
+                    self._model, self._tokenizer = shared.model, shared.tokenizer
+                    self._generation_kwargs = shared.generation_kwargs
+                    self._prefix_cache = shared.prefix_cache
+                    self._default_history_token_limit = shared.history_token_limit
+                    return shared.llm
                 except Exception as exc:  # pragma: no cover - requires HF runtime
-                    LOGGER.warning("Falling back to template responder: %s", exc)
-            return TemplateLLM(self._responder)
+                    _log_model_unavailable(model_path, f"loading failed: {exc!r}")
+            return _TEMPLATE_LLM
 
         def run(self, user_input: str, target_language: str = "en") -> str:
             if not user_input.strip():
                 return "I'm ready whenever you want to chat."
-            response = self._chain.predict(user_input=user_input, target_language=target_language)
-            return response.strip()
+            lookup = _lookup_response(self._response_cache, target_language, user_input)
+            if lookup.response is not None:
+                self._remember(user_input, lookup.response)
+                return lookup.response
+            response = self._complete(user_input, target_language)
+            if self._response_cache is not None:
+                self._response_cache.put(target_language, user_input, response, lookup.embedding)
+            return response
+
+        def stream(self, user_input: str, target_language: str = "en") -> Iterator[str]:
+            """Yield the response incrementally, recording it in memory once complete."""
+            if self._model is None or not user_input.strip():
+                yield from _stream_words(self.run(user_input=user_input, target_language=target_language))
+                return
+            lookup = _lookup_response(self._response_cache, target_language, user_input)
+            if lookup.response is not None:
+                self._remember(user_input, lookup.response)
+                yield lookup.response
+                return
+            prompt = self.render_prompt(user_input, target_language)
+            key = prompt_key(prompt) if self._prompt_cache is not None else None
+            cached = self._prompt_cache.get(key) if key is not None else None
+            if cached is not None:
+                self._remember(user_input, cached)
+                if self._response_cache is not None:
+                    self._response_cache.put(target_language, user_input, cached, lookup.embedding)
+                yield cached
+                return
+            chunks: List[str] = []
+            for chunk in _stream_generate(
+                self._model, self._tokenizer, prompt, self._generation_kwargs, self._prefix_cache
+            ):
+                chunks.append(chunk)
+                yield chunk
+            response = "".join(chunks).strip()
+            self._remember(user_input, response)
+            if key is not None:
+                self._prompt_cache.put(key, response)
+            if self._response_cache is not None:
+                self._response_cache.put(target_language, user_input, response, lookup.embedding)
+
+        def render_prompt(self, user_input: str, target_language: str = "en") -> str:
+            """Return the exact prompt the LLM would receive for this turn."""
+            history = self._memory.load_memory_variables({})["history"]
+            return _PROMPT.format(
+                history=history, user_input=user_input, target_language=target_language
+            )
+
+        def _complete(self, user_input: str, target_language: str) -> str:
+            prompt = self.render_prompt(user_input, target_language)
+            key = prompt_key(prompt) if self._prompt_cache is not None else None
+            response = self._prompt_cache.get(key) if key is not None else None
+            if response is None:
+                response = self._llm.invoke(prompt).strip()
+                if key is not None:
+                    self._prompt_cache.put(key, response)
+            self._remember(user_input, response)
+            return response
+
+        def _remember(self, user_input: str, response: str) -> None:
+            self._memory.save_context({"user_input": user_input}, {"text": response})
 
         def reset(self) -> None:
             self._memory.clear()
@@ -168,26 +528,66 @@ else:
             self,
             model_path: Optional[str] = None,  # pylint: disable=unused-argument
             generation_config: Optional[Dict[str, object]] = None,  # pylint: disable=unused-argument
+            response_cache: Optional[ResponseCache] = None,
+            prompt_cache: Optional[LRUCache] = None,
+            history_token_limit: Optional[int] = None,
+            quantization: Optional[str] = None,  # pylint: disable=unused-argument
+            max_batch_size: int = 1,  # pylint: disable=unused-argument
+            batch_wait_ms: float = 10.0,  # pylint: disable=unused-argument
+            torch_compile: bool = False,  # pylint: disable=unused-argument
         ) -> None:
             LOGGER.info(
                 "LangChain is unavailable; using a minimal in-memory orchestrator."
             )
+            if model_path:
+                _log_model_unavailable(model_path, "LangChain is not installed")
             self._responder = TemplateResponder()
-            self._history: List[str] = []
+            self._response_cache = response_cache
+            self._prompt_cache = prompt_cache
+            self._history_token_limit = (
+                history_token_limit if history_token_limit is not None else DEFAULT_HISTORY_TOKEN_LIMIT
+            )
+            self._history: Deque[str] = deque()
+            self._history_tokens = 0
 
         def run(self, user_input: str, target_language: str = "en") -> str:
             if not user_input.strip():
                 return "I'm ready whenever you want to chat."
-            history_text = "\n".join(self._history)
-            prompt = PROMPT_TEMPLATE.format(
-                history=history_text,
+            lookup = _lookup_response(self._response_cache, target_language, user_input)
+            if lookup.response is not None:
+                self._remember(user_input, lookup.response)
+                return lookup.response
+            prompt = self.render_prompt(user_input, target_language)
+            key = prompt_key(prompt) if self._prompt_cache is not None else None
+            response = self._prompt_cache.get(key) if key is not None else None
+            if response is None:
+                response = self._responder.generate(prompt).strip()
+                if key is not None:
+                    self._prompt_cache.put(key, response)
+            self._remember(user_input, response)
+            if self._response_cache is not None:
+                self._response_cache.put(target_language, user_input, response, lookup.embedding)
+            return response
+
+        def stream(self, user_input: str, target_language: str = "en") -> Iterator[str]:
+            """Yield the templated response word by word to mirror model streaming."""
+            yield from _stream_words(self.run(user_input=user_input, target_language=target_language))
+
+        def render_prompt(self, user_input: str, target_language: str = "en") -> str:
+            """Return the exact prompt the responder would receive for this turn."""
+            return PROMPT_TEMPLATE.format(
+                history="\n".join(self._history),
                 user_input=user_input,
                 target_language=target_language,
             )
-            response = self._responder.generate(prompt)
-            self._history.append(f"User: {user_input}")
-            self._history.append(f"Assistant: {response}")
-            return response.strip()
+
+        def _remember(self, user_input: str, response: str) -> None:
+            for line in (f"User: {user_input}", f"Assistant: {response}"):
+                self._history.append(line)
+                self._history_tokens += _count_words(line)
+            while self._history and self._history_tokens > self._history_token_limit:
+                self._history_tokens -= _count_words(self._history.popleft())
 
         def reset(self) -> None:
             self._history.clear()
+            self._history_tokens = 0
@@ -0,0 +1,53 @@
+"""Reuse of the attention key/value cache for the fixed system prompt prefix."""
+from __future__ import annotations
+
+import copy
+import logging
+from typing import Dict, Optional
+
+LOGGER = logging.getLogger(__name__)
+
+try:
+    import torch
+
+    _TORCH_AVAILABLE = True
+except ImportError:  # pragma: no cover - torch not installed during tests
+    torch = None  # type: ignore
+    _TORCH_AVAILABLE = False
+
+
+class PrefixKVCache:
+    """Precompute ``past_key_values`` for a prompt prefix shared by every request.
+
+    Every rendered prompt starts with the same system instruction, so its keys and
+    values are computed once and handed to ``model.generate``, which then only
+    runs attention over the remaining suffix tokens.
+    """
+
+    def __init__(self, model, tokenizer, prefix: str) -> None:
+        self._prefix_ids = tokenizer(prefix, return_tensors="pt").input_ids.to(model.device)
+        with torch.no_grad():
+            self._past_key_values = model(self._prefix_ids, use_cache=True).past_key_values
+
+    @classmethod
+    def build(cls, model, tokenizer, prefix: str) -> Optional["PrefixKVCache"]:
+        """Return a cache for ``prefix`` or ``None`` when the model cannot provide one."""
+        if not _TORCH_AVAILABLE:
+            return None
+        try:
+            return cls(model, tokenizer, prefix)
+        except Exception as exc:  # pragma: no cover - requires HF runtime
+            LOGGER.warning("Prefix KV-cache disabled: %s", exc)
+            return None
+
+    def generate_kwargs(self, input_ids) -> Dict[str, object]:
+        """Return ``past_key_values`` for ``input_ids`` if they begin with the cached prefix."""
+        prefix_length = self._prefix_ids.shape[1]
+        if (
+            input_ids.shape[0] != 1
+            or input_ids.shape[1] <= prefix_length
+            or not torch.equal(input_ids[0, :prefix_length], self._prefix_ids[0])
+        ):
+            return {}
+        # generate() extends the cache in place, so every call gets its own copy.
+        return {"past_key_values": copy.deepcopy(self._past_key_values)}
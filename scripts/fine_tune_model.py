@@ -3,8 +3,10 @@ from __future__ import annotations
 
 import argparse
 import logging
+import os
 from pathlib import Path
 
+import torch
 from datasets import load_dataset
 from transformers import (
     AutoModelForCausalLM,
@@ -15,6 +17,12 @@ from transformers import (
     set_seed,
 )
 
+try:
+    from peft import LoraConfig, get_peft_model
+except ImportError:  # pragma: no cover - LoRA is optional
+    LoraConfig = None  # type: ignore
+    get_peft_model = None  # type: ignore
+
 LOGGER = logging.getLogger(__name__)
 DEFAULT_DATA_PATH = Path("data/multilingual_chat_dataset.jsonl")
 
@@ -55,25 +63,58 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--seed", type=int, default=42, help="Random seed for dataset shuffling and training reproducibility."
     )
+    parser.add_argument(
+        "--num-proc",
+        type=int,
+        default=max(1, (os.cpu_count() or 1) - 1),
+        help="Worker processes used to tokenise the dataset.",
+    )
+    parser.add_argument(
+        "--lora",
+        action="store_true",
+        help="Train low-rank adapters with PEFT instead of every weight, then merge them before saving.",
+    )
+    parser.add_argument("--lora-rank", type=int, default=8, help="Rank of the LoRA update matrices.")
+    parser.add_argument(
+        "--attn-implementation",
+        choices=("sdpa", "flash_attention_2", "eager"),
+        default=None,
+        help=(
+            "Attention kernel; transformers picks one when unset. "
+            "flash_attention_2 needs a CUDA GPU and 'pip install flash-attn'."
+        ),
+    )
+    parser.add_argument(
+        "--gradient-checkpointing",
+        action="store_true",
+        help="Recompute activations in the backward pass to trade extra compute for much less memory.",
+    )
+    parser.add_argument(
+        "--torch-compile", action="store_true", help="Compile the model with torch.compile before training."
+    )
     return parser.parse_args()
 
 
-def tokenise_dataset(dataset_path: Path, tokenizer, max_length: int, eval_split: float, seed: int):
+def tokenise_dataset(
+    dataset_path: Path, tokenizer, max_length: int, eval_split: float, seed: int, num_proc: int = 1
+):
     LOGGER.info("Loading dataset from %s", dataset_path)
     raw_dataset = load_dataset("json", data_files=str(dataset_path))
     dataset = raw_dataset["train"]
 
     def preprocess(batch):
-        tokenised = tokenizer(
-            batch["text"],
-            truncation=True,
-            padding="max_length",
-            max_length=max_length,
-        )
-        tokenised["labels"] = tokenised["input_ids"].copy()
+        # Padding is left to the data collator so each batch is only as long as its longest row.
+        tokenised = tokenizer(batch["text"], truncation=True, max_length=max_length)
+        tokenised["length"] = [len(input_ids) for input_ids in tokenised["input_ids"]]
         return tokenised
 
-    tokenised_dataset = dataset.map(preprocess, batched=True, remove_columns=dataset.column_names)
+    tokenised_dataset = dataset.map(
+        preprocess,
+        batched=True,
+        batch_size=1000,
+        num_proc=min(num_proc, len(dataset)) or None,
+        remove_columns=dataset.column_names,
+    )
 
     if eval_split:
         split_dataset = tokenised_dataset.train_test_split(test_size=eval_split, seed=seed)
@@ -91,12 +132,33 @@ def main() -> None:
         tokenizer.pad_token = tokenizer.eos_token
 
     train_dataset, eval_dataset = tokenise_dataset(
-        args.dataset_path, tokenizer, args.max_length, args.eval_split, args.seed
+        args.dataset_path, tokenizer, args.max_length, args.eval_split, args.seed, args.num_proc
     )
 
-    model = AutoModelForCausalLM.from_pretrained(args.model_name_or_path)
+    use_cuda = torch.cuda.is_available()
+    use_bf16 = use_cuda and torch.cuda.is_bf16_supported()
+    model_kwargs = {}
+    if args.attn_implementation:
+        model_kwargs["attn_implementation"] = args.attn_implementation
+    if args.attn_implementation == "flash_attention_2":
+        if not use_bf16:
+            raise SystemExit("flash_attention_2 requires a CUDA GPU with bfloat16 support")
+        # Flash-Attention kernels only accept half-precision weights.
+        model_kwargs["torch_dtype"] = torch.bfloat16
+    model = AutoModelForCausalLM.from_pretrained(args.model_name_or_path, **model_kwargs)
     if getattr(model.config, "pad_token_id", None) is None:
         model.config.pad_token_id = tokenizer.pad_token_id
+    if args.lora:
+        if LoraConfig is None:
+            raise SystemExit("--lora requires the 'peft' package: pip install peft")
+        lora_config = LoraConfig(
+            r=args.lora_rank,
+            lora_alpha=2 * args.lora_rank,
+            lora_dropout=0.05,
+            task_type="CAUSAL_LM",
+        )
+        model = get_peft_model(model, lora_config)
+        model.print_trainable_parameters()
 
     data_collator = DataCollatorForLanguageModeling(tokenizer=tokenizer, mlm=False)
 
@@ -114,7 +176,18 @@ def main() -> None:
         save_total_limit=2,
         warmup_steps=10,
         weight_decay=0.01,
-        fp16=False,
+        bf16=use_bf16,
+        fp16=use_cuda and not use_bf16,
+        gradient_checkpointing=args.gradient_checkpointing,
+        # Non-reentrant checkpointing also works when only LoRA adapters require gradients.
+        gradient_checkpointing_kwargs={"use_reentrant": False} if args.gradient_checkpointing else None,
+        optim="adamw_torch_fused" if use_cuda else "adamw_torch",
+        dataloader_num_workers=max(1, (os.cpu_count() or 2) // 2),
+        dataloader_pin_memory=use_cuda,
+        torch_compile=args.torch_compile,
+        ddp_find_unused_parameters=False,
+        group_by_length=True,
+        length_column_name="length",
     )
 
     trainer = Trainer(
@@ -130,7 +203,11 @@ def main() -> None:
     trainer.train()
 
     LOGGER.info("Saving fine-tuned model to %s", args.output_dir)
-    trainer.save_model()
+    if args.lora:
+        # Merge the adapters so the API can load the result with AutoModelForCausalLM.
+        trainer.model.merge_and_unload().save_pretrained(args.output_dir)
+    else:
+        trainer.save_model()
     tokenizer.save_pretrained(args.output_dir)
 
     LOGGER.info("Fine-tuning completed.")
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def repo_root(pytestconfig):
+    """Working directory for tests that launch the app in a subprocess."""
+    return pytestconfig.rootpath
@@ -1,64 +1,146 @@
+import json
+import subprocess
 import sys
-from pathlib import Path
 
 import pytest
 
-sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+# Request bodies are serialised once at import rather than on every request.
+JSON = "application/json"
+CHAT_HELLO = json.dumps(
+    {
+        "message": "Hello",
+        "source_language": "en",
+        "target_language": "es",
+        "session_id": "test-session",
+    }
+).encode()
+CHAT_HISTORY = json.dumps(
+    {
+        "message": "Testing history",
+        "source_language": "en",
+        "target_language": "en",
+        "session_id": "chat-history-session",
+    }
+).encode()
+CHAT_EMPTY = json.dumps({"session_id": "empty-session", "message": ""}).encode()
+CHAT_STREAM = json.dumps(
+    {"message": "Stream me", "target_language": "fr", "session_id": "stream-session"}
+).encode()
+CHAT_NO_SESSION = b'{"message": "No session"}'
+CHAT_MINIMAL = b'{"message": "Hello"}'
+TTS_HELLO = b'{"text": "Hello world", "language_code": "en-US", "voice_id": "Joanna"}'
 
-from app import app
+# (payload, expected) pairs for POST /chat. "contains"/"equals" check the response text;
+# every other key must match the response body exactly.
+CHAT_CASES = [
+    (
+        CHAT_HELLO,
+        {
+            "session_id": "test-session",
+            "source_language": "en",
+            "target_language": "es",
+            "contains": "Hello",
+        },
+    ),
+    (
+        CHAT_HISTORY,
+        {"session_id": "chat-history-session", "target_language": "en", "contains": "Testing history"},
+    ),
+    (
+        CHAT_EMPTY,
+        {"session_id": "empty-session", "equals": "I'm ready whenever you want to chat."},
+    ),
+]
+CHAT_CASE_IDS = ["hello", "history", "empty"]
 
 
-@pytest.fixture
-def client():
+@pytest.fixture(scope="session")
+def flask_app():
+    # Imported here so collecting the tests does not load the app and its model stack.
+    from app import app
+
     app.config.update({"TESTING": True})
-    with app.test_client() as test_client:
+    return app
+
+
+@pytest.fixture(scope="session")
+def client(flask_app):
+    with flask_app.test_client() as test_client:
         yield test_client
 
 
-def test_chat_endpoint_returns_response_and_session(client):
-    response = client.post(
-        "/chat",
-        json={
-            "message": "Hello",
-            "source_language": "en",
-            "target_language": "es",
-            "session_id": "test-session",
-        },
+@pytest.fixture(scope="module")
+def tts_response(client):
+    """Synthesise speech once per module and share the response between TTS tests."""
+    return client.post(
+        "/text-to-speech",
+        data=TTS_HELLO,
+        content_type=JSON,
     )
+
+
+@pytest.fixture
+def history_repo(flask_app):
+    from app import _history_repo
+
+    return _history_repo
+
+
+@pytest.fixture
+def seed_history(history_repo):
+    """Write a turn straight into the history store, skipping a setup POST /chat."""
+    seeded = []
+
+    def seed(session_id, user_input):
+        history_repo.append(
+            session_id=session_id,
+            user_input=user_input,
+            bot_response=f"You said: {user_input}. Let me know if you need more help.",
+            source_language="en",
+            target_language="en",
+        )
+        seeded.append(session_id)
+        return session_id
+
+    yield seed
+    for session_id in seeded:
+        history_repo.clear(session_id)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("payload,expected", CHAT_CASES, ids=CHAT_CASE_IDS)
+def test_chat_post(client, history_repo, payload, expected):
+    response = client.post("/chat", data=payload, content_type=JSON)
     assert response.status_code == 200
     body = response.get_json()
-    assert body["session_id"] == "test-session"
-    assert body["source_language"] == "en"
-    assert body["target_language"] == "es"
+    expected = dict(expected)
+    contains = expected.pop("contains", None)
+    equals = expected.pop("equals", None)
+    assert {key: body[key] for key in expected} == expected
     assert isinstance(body["response"], str)
-    assert "Hello" in body["response"]
+    if contains is not None:
+        assert contains in body["response"]
+    if equals is not None:
+        assert body["response"] == equals
+    assert history_repo.get(body["session_id"])[-1]["bot_response"] == body["response"]
 
 
-def test_chat_history_endpoint_reflects_previous_messages(client):
-    client.post(
-        "/chat",
-        json={
-            "message": "Testing history",
-            "source_language": "en",
-            "target_language": "en",
-            "session_id": "history-session",
-        },
-    )
+def test_chat_history_endpoint_reflects_previous_messages(client, seed_history):
+    seed_history("history-session", "Testing history")
 
     response = client.get("/chat-history/history-session")
     assert response.status_code == 200
     history = response.get_json()
     assert len(history) == 1
     record = history[0]
+    assert record["session_id"] == "history-session"
+    assert "timestamp" in record
     assert record["user_input"] == "Testing history"
     assert "Testing history" in record["bot_response"]
 
 
-def test_reset_history_endpoint(client):
-    client.post(
-        "/chat",
-        json={"message": "Reset me", "session_id": "reset-session"},
-    )
+def test_reset_history_endpoint(client, seed_history):
+    seed_history("reset-session", "Reset me")
     response = client.delete("/chat-history/reset-session")
     assert response.status_code == 200
     body = response.get_json()
@@ -69,20 +151,238 @@ def test_reset_history_endpoint(client):
     assert history_response.get_json() == []
 
 
-def test_text_to_speech_returns_audio_payload(client):
+@pytest.mark.slow
+def test_text_to_speech_returns_audio_payload(tts_response):
+    assert tts_response.status_code == 200
+    assert tts_response.headers["Content-Type"] == "audio/mpeg"
+    assert tts_response.data.startswith(b"ID3")
+
+
+@pytest.mark.slow
+def test_chat_stream_emits_tokens_and_persists_history(client):
     response = client.post(
-        "/text-to-speech",
-        json={"text": "Hello world", "language_code": "en-US", "voice_id": "Joanna"},
+        "/chat/stream",
+        data=CHAT_STREAM,
+        content_type=JSON,
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = [chunk for chunk in response.get_data(as_text=True).split("\n\n") if chunk]
+    tokens = [json.loads(event[len("data: "):])["token"] for event in events[:-1]]
+    assert len(tokens) > 1
+    assert events[-1].startswith("event: done")
+
+    history = client.get("/chat-history/stream-session").get_json()
+    assert len(history) == 1
+    assert "Stream me" in history[0]["bot_response"]
+    assert "".join(tokens).strip() == history[0]["bot_response"]
+
+
+def _track_resets(orchestrator, name, resets):
+    reset = orchestrator.reset
+
+    def tracked_reset():
+        resets.append(name)
+        reset()
+
+    orchestrator.reset = tracked_reset
+    return orchestrator
+
+
+def test_orchestrator_pool_evicts_least_recently_used_session():
+    from app import OrchestratorPool
+
+    resets = []
+    pool = OrchestratorPool(model_path=None, generation_config=None, max_sessions=2)
+    first = _track_resets(pool.get("first"), "first", resets)
+    second = _track_resets(pool.get("second"), "second", resets)
+    assert pool.get("first") is first
+    third = pool.get("third")
+    assert len(pool) == 2
+    assert resets == ["second"]
+    assert pool.get("third") is third
+    assert pool.get("second") is not second
+    assert resets == ["second", "first"]
+
+
+def test_orchestrator_pool_reaps_idle_sessions():
+    from app import OrchestratorPool
+
+    clock = [100.0]
+    resets = []
+    pool = OrchestratorPool(
+        model_path=None, generation_config=None, session_ttl_seconds=60, clock=lambda: clock[0]
     )
+    idle = _track_resets(pool.get("idle"), "idle", resets)
+    clock[0] += 45
+    active = pool.get("active")
+    clock[0] += 30
+    assert pool.get("active") is active
+    assert len(pool) == 1
+    assert resets == ["idle"]
+    assert pool.get("idle") is not idle
+
+
+def test_index_supports_conditional_requests(client):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.mimetype == "text/html"
+    etag = response.headers["ETag"]
+
+    cached = client.get("/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+@pytest.mark.slow
+def test_chat_generates_session_id_when_missing(client):
+    response = client.post("/chat", data=CHAT_NO_SESSION, content_type=JSON)
     assert response.status_code == 200
-    assert response.headers["Content-Type"] == "audio/mpeg"
-    assert response.data.startswith(b"ID3")
+    session_id = response.get_json()["session_id"]
+    assert len(session_id) == 32
+    assert int(session_id, 16) >= 0
 
 
-def test_empty_chat_message_returns_default_prompt(client):
+def test_oversized_body_is_rejected(client):
     response = client.post(
         "/chat",
-        json={"session_id": "empty-session", "message": ""},
+        data=b'{"message": "' + b"a" * (64 * 1024) + b'"}',
+        content_type=JSON,
     )
-    assert response.status_code == 200
-    assert response.get_json()["response"] == "I'm ready whenever you want to chat."
+    assert response.status_code == 413
+
+
+def test_transfer_encoding_header_is_rejected(client):
+    response = client.post(
+        "/chat",
+        data=CHAT_MINIMAL,
+        content_type=JSON,
+        headers={"Transfer-Encoding": "chunked"},
+    )
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Transfer-Encoding is not supported"}
+
+
+GEVENT_STREAM_SCRIPT = """
+import wsgi  # monkey-patches the process exactly like the gunicorn entrypoint
+
+import json
+import time
+from types import SimpleNamespace
+
+import gevent
+import torch
+from gevent.monkey import get_original
+
+from app import _orchestrators, app
+
+native_sleep = get_original("time", "sleep")
+
+
+class FakeTokenizer:
+    pad_token_id = 0
+
+    def __call__(self, text, return_tensors=None):
+        ids = torch.ones((1, 3), dtype=torch.long)
+        return {"input_ids": ids, "attention_mask": ids}
+
+    def decode(self, ids, **kwargs):
+        return ""
+
+
+class FakeModel:
+    device = torch.device("cpu")
+    config = SimpleNamespace(max_position_embeddings=1024)
+
+    def generate(self, streamer=None, **kwargs):
+        for index in range(5):
+            native_sleep(0.1)  # holds the OS thread the way a forward pass does
+            streamer.on_finalized_text(f"t{index} ")
+        streamer.end()
+
+
+orchestrator = _orchestrators.get("gevent-stream")
+orchestrator._model, orchestrator._tokenizer = FakeModel(), FakeTokenizer()
+
+ticks = []
+ticker = gevent.spawn(lambda: [ticks.append(time.monotonic()) or gevent.sleep(0.01) for _ in range(80)])
+started = time.monotonic()
+response = app.test_client().post(
+    "/chat/stream", json={"message": "Hi", "session_id": "gevent-stream"}, buffered=False
+)
+arrivals = [time.monotonic() - started for chunk in response.response if b"token" in chunk]
+ticker.join()
+gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+print(json.dumps({"arrivals": arrivals, "max_gap": max(gaps)}))
+"""
+
+
+@pytest.mark.slow
+def test_chat_stream_yields_tokens_incrementally_under_gevent(repo_root):
+    pytest.importorskip("gevent")
+    pytest.importorskip("transformers")
+    result = subprocess.run(
+        [sys.executable, "-c", GEVENT_STREAM_SCRIPT],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    arrivals = timings["arrivals"]
+    assert len(arrivals) == 5
+    assert arrivals[0] < 0.3  # the first token does not wait for the whole generation
+    assert arrivals[-1] - arrivals[0] > 0.25
+    assert timings["max_gap"] < 0.08  # other greenlets keep running during generation
+
+
+GEVENT_FIRST_LOAD_SCRIPT = """
+import wsgi  # monkey-patches the process exactly like the gunicorn entrypoint
+
+import json
+import time
+
+import gevent
+from gevent.monkey import get_original
+
+import app as app_module
+
+native_sleep = get_original("time", "sleep")
+
+
+class SlowLoadingOrchestrator(app_module.PromptOrchestrator):
+    def __init__(self, **kwargs):
+        native_sleep(0.3)  # holds the OS thread the way loading the weights does
+        super().__init__(**kwargs)
+
+
+app_module.PromptOrchestrator = SlowLoadingOrchestrator
+client = app_module.app.test_client()
+
+ticks = []
+ticker = gevent.spawn(lambda: [ticks.append(time.monotonic()) or gevent.sleep(0.01) for _ in range(50)])
+requests = [
+    gevent.spawn(client.post, "/chat", json={"message": "Hi", "session_id": f"first-load-{index}"})
+    for index in range(2)
+]
+gevent.joinall(requests + [ticker])
+gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+print(json.dumps({"statuses": [g.value.status_code for g in requests], "max_gap": max(gaps)}))
+"""
+
+
+@pytest.mark.slow
+def test_first_orchestrator_load_does_not_block_gevent(repo_root):
+    pytest.importorskip("gevent")
+    result = subprocess.run(
+        [sys.executable, "-c", GEVENT_FIRST_LOAD_SCRIPT],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    outcome = json.loads(result.stdout.strip().splitlines()[-1])
+    assert outcome["statuses"] == [200, 200]
+    assert outcome["max_gap"] < 0.1
@@ -0,0 +1,142 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def batched_generator():
+    # Imported here so collecting the tests does not load torch.
+    from ml.batcher import BatchedGenerator
+
+    return BatchedGenerator
+
+
+@pytest.fixture(scope="module")
+def recording_generator(batched_generator):
+    class RecordingGenerator(batched_generator):
+        def __init__(self, **kwargs):
+            self.batches = []
+            super().__init__(model=None, tokenizer=None, **kwargs)
+
+        def _generate_batch(self, prompts):
+            self.batches.append(list(prompts))
+            return [prompt.upper() for prompt in prompts]
+
+    return RecordingGenerator
+
+
+def test_batched_generator_coalesces_queued_prompts(recording_generator):
+    generator = recording_generator(max_batch_size=2, max_wait_ms=200)
+    futures = [generator.generate_async(prompt) for prompt in ("a", "b", "c")]
+
+    assert [future.result(timeout=5) for future in futures] == ["A", "B", "C"]
+    assert all(len(batch) <= 2 for batch in generator.batches)
+    assert [prompt for batch in generator.batches for prompt in batch] == ["a", "b", "c"]
+
+
+class WordTokenizer:
+    """Left-padding tokenizer with one token id per word."""
+
+    pad_token_id = 0
+
+    def __call__(self, prompts, padding=True, return_tensors="pt"):
+        import torch
+
+        rows = [[len(word) for word in prompt.split()] for prompt in prompts]
+        width = max(len(row) for row in rows)
+        ids = [[self.pad_token_id] * (width - len(row)) + row for row in rows]
+        mask = [[0] * (width - len(row)) + [1] * len(row) for row in rows]
+        return {"input_ids": torch.tensor(ids), "attention_mask": torch.tensor(mask)}
+
+    def batch_decode(self, token_ids, skip_special_tokens=True):
+        return [" ".join(str(int(token)) for token in row) for row in token_ids]
+
+
+class EchoModel:
+    def __init__(self):
+        import torch
+
+        self.device = torch.device("cpu")
+        self.inputs = []
+
+    def generate(self, input_ids, attention_mask, **kwargs):
+        import torch
+
+        self.inputs.append(input_ids.tolist())
+        return torch.cat([input_ids, attention_mask.sum(dim=1, keepdim=True)], dim=1)
+
+
+def test_batched_generator_keeps_the_tail_of_long_prompts(batched_generator):
+    pytest.importorskip("torch")
+    model = EchoModel()
+    generator = batched_generator(
+        model, WordTokenizer(), max_batch_size=2, max_wait_ms=200, max_input_tokens=4
+    )
+    long_prompt = " ".join(["word"] * 50) + " a bb"
+    futures = [generator.generate_async(prompt) for prompt in (long_prompt, "ccc")]
+
+    assert [future.result(timeout=5) for future in futures] == ["4", "1"]
+    assert model.inputs == [[[4, 4, 1, 2], [0, 0, 0, 3]]]
+
+
+GEVENT_BATCH_SCRIPT = """
+import wsgi  # monkey-patches the process and sizes the threadpool like the gunicorn entrypoint
+
+import json
+import time
+
+import gevent
+from gevent.monkey import get_original
+
+from app import _run_blocking
+from ml.batcher import BatchedGenerator
+
+native_sleep = get_original("time", "sleep")
+
+
+class SlowGenerator(BatchedGenerator):
+    def __init__(self, **kwargs):
+        self.batches = []
+        super().__init__(model=None, tokenizer=None, **kwargs)
+
+    def _generate_batch(self, prompts):
+        self.batches.append(len(prompts))
+        native_sleep(0.3)  # holds the OS thread the way a batched forward pass does
+        return list(prompts)
+
+
+generator = SlowGenerator(max_batch_size=16, max_wait_ms=100)
+ticks = []
+ticker = gevent.spawn(lambda: [ticks.append(time.monotonic()) or gevent.sleep(0.01) for _ in range(40)])
+requests = [gevent.spawn(_run_blocking, generator.generate, str(index)) for index in range(8)]
+gevent.joinall(requests + [ticker])
+gaps = [later - earlier for earlier, later in zip(ticks, ticks[1:])]
+print(json.dumps({"batches": generator.batches, "results": [g.value for g in requests], "max_gap": max(gaps)}))
+"""
+
+
+@pytest.mark.slow
+def test_batched_generator_fills_batches_without_blocking_gevent(repo_root):
+    pytest.importorskip("gevent")
+    result = subprocess.run(
+        [sys.executable, "-c", GEVENT_BATCH_SCRIPT],
+        cwd=repo_root,
+        env={**os.environ, "ORCHESTRATOR_MAX_BATCH_SIZE": "16"},
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    outcome = json.loads(result.stdout.strip().splitlines()[-1])
+    assert outcome["results"] == [str(index) for index in range(8)]
+    assert outcome["batches"] == [8]
+    assert outcome["max_gap"] < 0.1
+
+
+def test_batched_generator_requires_torch_for_a_real_model(batched_generator, monkeypatch):
+    monkeypatch.setattr("ml.batcher._TORCH_AVAILABLE", False)
+    with pytest.raises(RuntimeError, match="needs torch"):
+        batched_generator(model=object(), tokenizer=None)
@@ -0,0 +1,89 @@
+import pytest
+
+from ml.cache import LRUCache, ResponseCache, prompt_key
+
+
+@pytest.fixture(scope="module")
+def prompt_orchestrator():
+    # Imported here so collecting the tests does not load torch, transformers and LangChain.
+    from ml.orchestrator import PromptOrchestrator
+
+    return PromptOrchestrator
+
+
+def test_response_cache_normalises_user_input():
+    cache = ResponseCache(max_entries=4)
+    cache.put("es", "  Hello ", "Hola")
+    assert cache.get("es", "hello") == "Hola"
+    assert cache.get("fr", "hello") is None
+
+
+def test_lru_cache_evicts_least_recently_used_entry():
+    evicted = []
+    cache = LRUCache(max_entries=2, on_evict=evicted.append)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert evicted == ["b"]
+
+
+def test_lru_cache_expires_entries():
+    clock = [100.0]
+    cache = LRUCache(max_entries=2, ttl_seconds=5, clock=lambda: clock[0])
+    cache.put("a", "1")
+    clock[0] += 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_response_cache_serves_similar_prompts():
+    np = pytest.importorskip("numpy")
+    vectors = {
+        "how are you?": np.array([1.0, 0.0], dtype=np.float32),
+        "how are you": np.array([0.99, 0.141], dtype=np.float32),
+        "goodbye": np.array([0.0, 1.0], dtype=np.float32),
+    }
+    cache = ResponseCache(max_entries=4, embedder=vectors.__getitem__)
+    cache.put("en", "How are you?", "I'm well")
+    assert cache.get("en", "how are you") == "I'm well"
+    assert cache.get("en", "goodbye") is None
+    assert cache.get("de", "how are you") is None
+
+
+def test_orchestrator_embeds_each_uncached_input_once(prompt_orchestrator):
+    np = pytest.importorskip("numpy")
+    embedded = []
+
+    def embedder(text):
+        embedded.append(text)
+        return np.array([1.0, 0.0], dtype=np.float32)
+
+    orchestrator = prompt_orchestrator(response_cache=ResponseCache(max_entries=4, embedder=embedder))
+    orchestrator.run("Hello", target_language="es")
+    assert embedded == ["hello"]
+
+
+def test_prompt_cache_is_shared_between_orchestrators(prompt_orchestrator):
+    prompt_cache = LRUCache(max_entries=8)
+    first = prompt_orchestrator(prompt_cache=prompt_cache)
+    second = prompt_orchestrator(prompt_cache=prompt_cache)
+    assert first.run("Hello", target_language="es") == second.run("Hello", target_language="es")
+    assert len(prompt_cache) == 1
+    assert "Hello" in second.render_prompt("Again", target_language="es")
+
+
+def test_stream_serves_prompt_cache_hits_without_generating(prompt_orchestrator, monkeypatch):
+    def fail_generate(*args, **kwargs):
+        raise AssertionError("cached prompts must not be regenerated")
+
+    prompt_cache = LRUCache(max_entries=8)
+    orchestrator = prompt_orchestrator(prompt_cache=prompt_cache)
+    prompt_cache.put(prompt_key(orchestrator.render_prompt("Hello", target_language="es")), "Hola")
+    orchestrator._model = object()  # take the model-backed streaming path
+    monkeypatch.setattr("ml.orchestrator._stream_generate", fail_generate)
+
+    assert list(orchestrator.stream("Hello", target_language="es")) == ["Hola"]
+    assert "Hola" in orchestrator.render_prompt("Again", target_language="es")
@@ -0,0 +1,113 @@
+import json
+import logging
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def orchestrator_module():
+    # Imported here so collecting the tests does not load torch, transformers and LangChain.
+    from ml import orchestrator
+
+    return orchestrator
+
+
+def test_history_is_trimmed_to_token_limit(orchestrator_module):
+    orchestrator = orchestrator_module.PromptOrchestrator(history_token_limit=30)
+    for turn in range(5):
+        orchestrator.run(f"message number {turn}")
+
+    prompt = orchestrator.render_prompt("latest")
+    assert "message number 4" in prompt
+    assert "message number 0" not in prompt
+
+
+def test_template_responder_reads_last_user_line_and_language(orchestrator_module):
+    responder = orchestrator_module.TemplateResponder()
+    prompt = orchestrator_module.PROMPT_TEMPLATE.format(
+        target_language="  fr ",
+        history="User: earlier\nAssistant: ok",
+        user_input="  latest question  ",
+    )
+    assert responder.generate(prompt) == "[fr] You said: latest question. Let me know if you need more help."
+    assert responder.generate("Target language:\nUser:\nAssistant:") == "I'm ready whenever you want to chat."
+
+
+def test_configured_model_that_cannot_load_is_logged_as_error(orchestrator_module, monkeypatch, caplog):
+    monkeypatch.setattr(orchestrator_module, "_TRANSFORMERS_AVAILABLE", False)
+    orchestrator_module._log_model_unavailable.cache_clear()
+
+    with caplog.at_level(logging.ERROR, logger="ml.orchestrator"):
+        orchestrator_module.PromptOrchestrator(model_path="/models/missing")
+        orchestrator_module.PromptOrchestrator(model_path="/models/missing")
+
+    errors = [record for record in caplog.records if record.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert "/models/missing" in errors[0].getMessage()
+
+
+@pytest.fixture
+def small_context_model(orchestrator_module, tmp_path):
+    """Save a randomly initialised GPT-2 with a 64-position context and a word-level tokenizer."""
+    pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+    tokenizers = pytest.importorskip("tokenizers")
+
+    vocab = {"[UNK]": 0, "[EOS]": 1}
+    vocab.update({word: index + 2 for index, word in enumerate("hello user assistant word".split())})
+    word_level = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, unk_token="[UNK]"))
+    word_level.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer = transformers.PreTrainedTokenizerFast(
+        tokenizer_object=word_level, unk_token="[UNK]", eos_token="[EOS]"
+    )
+    config = transformers.GPT2Config(
+        vocab_size=len(vocab), n_positions=64, n_embd=16, n_layer=1, n_head=2, eos_token_id=1
+    )
+    tokenizer.save_pretrained(tmp_path)
+    transformers.GPT2LMHeadModel(config).save_pretrained(tmp_path)
+    yield str(tmp_path)
+    orchestrator_module._load_shared_model.cache_clear()
+
+
+@pytest.mark.parametrize("max_batch_size", [1, 2], ids=["direct", "batched"])
+def test_long_prompts_fit_a_small_context_model(orchestrator_module, small_context_model, max_batch_size):
+    config_key = json.dumps({"max_new_tokens": 16})
+    shared = orchestrator_module._load_shared_model(small_context_model, config_key, None, max_batch_size)
+    prompt = " ".join(["word"] * 200) + "\nUser: hello\nAssistant:"
+
+    assert isinstance(shared.llm.invoke(prompt), str)
+    assert isinstance(
+        "".join(
+            orchestrator_module._stream_generate(
+                shared.model, shared.tokenizer, prompt, shared.generation_kwargs, shared.prefix_cache
+            )
+        ),
+        str,
+    )
+
+
+def test_history_limit_leaves_room_in_a_small_context(orchestrator_module, small_context_model):
+    orchestrator = orchestrator_module.PromptOrchestrator(
+        model_path=small_context_model, generation_config={"max_new_tokens": 16}
+    )
+    assert 0 < orchestrator._memory.max_token_limit <= (64 - 16) // 2
+
+    for turn in range(5):
+        assert isinstance(orchestrator.run(f"hello word {turn}"), str)
+
+
+@pytest.mark.slow
+def test_wsgi_entrypoint_keeps_transformers_importable(repo_root):
+    pytest.importorskip("gevent")
+    pytest.importorskip("transformers")
+    result = subprocess.run(
+        [sys.executable, "-c", "import wsgi; from ml import orchestrator; print(orchestrator._TRANSFORMERS_AVAILABLE)"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "True"
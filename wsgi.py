@@ -0,0 +1,20 @@
+"""Gevent WSGI entrypoint: ``gunicorn -k gevent --preload --worker-connections 1000 wsgi:app``.
+
+``--preload`` imports this module in the unpatched gunicorn master. ``select`` is left
+unpatched until the app has been imported: gevent removes ``select.epoll``, which
+huggingface_hub (and therefore transformers) needs at import time. The gevent worker
+patches everything, ``select`` included, after forking.
+"""
+from gevent import monkey
+
+monkey.patch_all(select=False)
+
+import os  # noqa: E402  pylint: disable=wrong-import-position
+
+from gevent import get_hub  # noqa: E402  pylint: disable=wrong-import-position
+
+from app import MAX_BATCH_SIZE, app  # noqa: E402,F401  pylint: disable=wrong-import-position
+
+# Model inference is offloaded to the hub's native threadpool (see ``app._run_blocking``).
+# Each batched request waits on its own pool thread, so a smaller pool would cap batch size.
+get_hub().threadpool.maxsize = max(int(os.environ.get("MODEL_THREADPOOL_SIZE", "4")), MAX_BATCH_SIZE)